@@ -1,213 +1,504 @@
-#!/usr/bin/env python3
-"""
-Flask web application for Text Classification Tool
-"""
-
-from flask import Flask, render_template, request, jsonify, send_file
-import json
-import os
-from text_classifier import TextClassifier
-from werkzeug.utils import secure_filename
-import tempfile
-
-app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
-
-# Initialize classifier
-classifier = None
-
-def init_classifier():
-    """Initialize the text classifier"""
-    global classifier
-    try:
-        classifier = TextClassifier()
-        return True, "Classifier initialized successfully"
-    except Exception as e:
-        return False, str(e)
-
-@app.route('/')
-def index():
-    """Main page"""
-    return render_template('index.html')
-
-@app.route('/api/classify', methods=['POST'])
-def classify_text():
-    """Classify a single text"""
-    global classifier
-    
-    if classifier is None:
-        success, message = init_classifier()
-        if not success:
-            return jsonify({'error': f'Failed to initialize classifier: {message}'}), 500
-    
-    data = request.get_json()
-    text = data.get('text', '').strip()
-    
-    if not text:
-        return jsonify({'error': 'No text provided'}), 400
-    
-    try:
-        result = classifier.classify(text)
-        
-        response = {
-            'text': result.text,
-            'predicted_label': result.predicted_label,
-            'confidence': result.confidence,
-            'rationale': result.rationale
-        }
-        
-        if result.error:
-            response['error'] = result.error
-        
-        return jsonify(response)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/classify-batch', methods=['POST'])
-def classify_batch():
-    """Classify multiple texts"""
-    global classifier
-    
-    if classifier is None:
-        success, message = init_classifier()
-        if not success:
-            return jsonify({'error': f'Failed to initialize classifier: {message}'}), 500
-    
-    data = request.get_json()
-    texts = data.get('texts', [])
-    
-    if not texts or not isinstance(texts, list):
-        return jsonify({'error': 'No texts provided or invalid format'}), 400
-    
-    if len(texts) > 100:  # Limit batch size
-        return jsonify({'error': 'Maximum 100 texts per batch'}), 400
-    
-    try:
-        results = classifier.classify_batch(texts)
-        
-        response = []
-        for result in results:
-            item = {
-                'text': result.text,
-                'predicted_label': result.predicted_label,
-                'confidence': result.confidence,
-                'rationale': result.rationale
-            }
-            if result.error:
-                item['error'] = result.error
-            response.append(item)
-        
-        return jsonify({'results': response, 'count': len(response)})
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/classify-file', methods=['POST'])
-def classify_file():
-    """Classify texts from uploaded file"""
-    global classifier
-    
-    if classifier is None:
-        success, message = init_classifier()
-        if not success:
-            return jsonify({'error': f'Failed to initialize classifier: {message}'}), 500
-    
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    try:
-        # Read file content
-        content = file.read().decode('utf-8')
-        
-        # Try to parse as JSON first
-        try:
-            data = json.loads(content)
-            if isinstance(data, list):
-                texts = [str(t) for t in data]
-            else:
-                texts = [content]
-        except json.JSONDecodeError:
-            # Treat as line-separated text
-            texts = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        if not texts:
-            return jsonify({'error': 'No valid texts found in file'}), 400
-        
-        if len(texts) > 100:
-            return jsonify({'error': 'Maximum 100 texts per file'}), 400
-        
-        # Classify
-        results = classifier.classify_batch(texts)
-        
-        response = []
-        for result in results:
-            item = {
-                'text': result.text,
-                'predicted_label': result.predicted_label,
-                'confidence': result.confidence,
-                'rationale': result.rationale
-            }
-            if result.error:
-                item['error'] = result.error
-            response.append(item)
-        
-        return jsonify({'results': response, 'count': len(response)})
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/status', methods=['GET'])
-def get_status():
-    """Get classifier status"""
-    global classifier
-    
-    if classifier is None:
-        success, message = init_classifier()
-        if not success:
-            return jsonify({
-                'status': 'error',
-                'message': message,
-                'labels': []
-            })
-    
-    return jsonify({
-        'status': 'ready',
-        'labels': classifier.labels,
-        'model': classifier.model
-    })
-
-@app.route('/api/download-results', methods=['POST'])
-def download_results():
-    """Download classification results as JSON"""
-    data = request.get_json()
-    results = data.get('results', [])
-    
-    if not results:
-        return jsonify({'error': 'No results to download'}), 400
-    
-    # Create temporary file
-    temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False)
-    json.dump(results, temp_file, indent=2, ensure_ascii=False)
-    temp_file.close()
-    
-    return send_file(
-        temp_file.name,
-        mimetype='application/json',
-        as_attachment=True,
-        download_name='classification_results.json'
-    )
-
-if __name__ == '__main__':
-    # Initialize classifier on startup
-    init_classifier()
-    
-    # Run the app
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
+#!/usr/bin/env python3
+"""
+Flask web application for Text Classification Tool
+"""
+
+from flask import Flask, render_template, request, Response
+import hashlib
+import io
+import orjson
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from text_classifier import TextClassifier, ClassificationResult
+from werkzeug.utils import secure_filename
+import tempfile
+
+app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+
+# Initialize classifier
+classifier = None
+
+# Constant 400 bodies serialized once at import time so the common error
+# paths skip dict construction and JSON encoding entirely
+ERR_NO_TEXT = orjson.dumps({'error': 'No text provided'})
+ERR_NO_TEXTS = orjson.dumps({'error': 'No texts provided or invalid format'})
+ERR_BATCH_LIMIT = orjson.dumps({'error': 'Maximum 100 texts per batch'})
+ERR_NO_FILE = orjson.dumps({'error': 'No file provided'})
+ERR_NO_FILE_SELECTED = orjson.dumps({'error': 'No file selected'})
+ERR_FILE_LIMIT = orjson.dumps({'error': 'Maximum 100 texts per file'})
+ERR_NO_FILE_TEXTS = orjson.dumps({'error': 'No valid texts found in file'})
+ERR_NO_RESULTS = orjson.dumps({'error': 'No results to download'})
+ERR_NOT_UTF8 = orjson.dumps({'error': 'File must be UTF-8 encoded'})
+
+
+def _json(body, status=200):
+    """Serialize a response body with orjson, bypassing jsonify"""
+    return Response(orjson.dumps(body), status=status, mimetype='application/json')
+
+
+def _error_response(body):
+    """Build a 400 response from a pre-serialized error body"""
+    # A fresh Response per request keeps headers/state per-request safe
+    return Response(body, status=400, mimetype='application/json')
+
+# In-process LRU cache: SHA-256(text) -> ClassificationResult.
+# Hand-rolled on OrderedDict (rather than functools.lru_cache) so the batch
+# endpoints can test membership and prime entries after a miss.
+CACHE_MAXSIZE = 4096
+
+# On-disk tier backing the in-memory LRU so cached results survive
+# restarts (and are shared between gunicorn workers via the filesystem)
+CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.classify_cache.db')
+CACHE_TTL = 86400  # seconds before a disk entry expires
+
+# Fuzzy tier: recent (simhash, result) pairs checked by Hamming distance
+# so near-duplicates (extra punctuation, small typos) still hit the cache
+FUZZY_MAXSIZE = 1024
+FUZZY_MAX_DISTANCE = 3
+
+_cache = OrderedDict()
+_cache_hits = 0
+_cache_misses = 0
+_fuzzy_hits = 0
+_fuzzy_recent = deque(maxlen=FUZZY_MAXSIZE)
+
+
+def _cache_db():
+    """Open the on-disk cache, creating the table on first use"""
+    # A connection per call keeps this safe across workers and threads
+    conn = sqlite3.connect(CACHE_DB)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS cache '
+        '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+    )
+    return conn
+
+
+def _disk_get(key):
+    """Look up a result in the on-disk cache, expiring stale entries"""
+    try:
+        with _cache_db() as conn:
+            row = conn.execute(
+                'SELECT value, created FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if time.time() - created > CACHE_TTL:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+        return ClassificationResult(**orjson.loads(value))
+    except sqlite3.Error:
+        # A broken cache file should never break classification
+        return None
+
+
+def _disk_get_many(keys):
+    """Batch lookup in the on-disk cache: one query for any number of keys.
+
+    The SQLite file is the tier shared between gunicorn workers, so a
+    worker's batch benefits from every other worker's hits in a single
+    round-trip instead of one query per text.
+    """
+    if not keys:
+        return {}
+    try:
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        with _cache_db() as conn:
+            rows = conn.execute(
+                f'SELECT key, value, created FROM cache WHERE key IN ({placeholders})',
+                list(keys)
+            ).fetchall()
+        return {
+            key: ClassificationResult(**orjson.loads(value))
+            for key, value, created in rows
+            if now - created <= CACHE_TTL
+        }
+    except sqlite3.Error:
+        return {}
+
+
+def _disk_put(key, result):
+    """Store a result in the on-disk cache"""
+    try:
+        with _cache_db() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                (key, orjson.dumps(asdict(result)).decode(), time.time())
+            )
+    except sqlite3.Error:
+        pass
+
+
+def _text_hash(text):
+    """Build a stable cache key for a text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _mem_get(key):
+    """Look up a result in the in-memory LRU, refreshing its position"""
+    result = _cache.get(key)
+    if result is not None:
+        _cache.move_to_end(key)
+    return result
+
+
+def _mem_put(key, result):
+    """Insert into the in-memory LRU, evicting the oldest entry if full"""
+    _cache[key] = result
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_MAXSIZE:
+        _cache.popitem(last=False)
+
+
+def _cache_get(key):
+    """Look up a cached result in memory, then on disk"""
+    global _cache_hits, _cache_misses
+    result = _mem_get(key)
+    if result is None:
+        result = _disk_get(key)
+        if result is not None:
+            # Promote disk hits into the in-memory LRU
+            _mem_put(key, result)
+
+    if result is None:
+        _cache_misses += 1
+    else:
+        _cache_hits += 1
+    return result
+
+
+def _cache_put(key, result):
+    """Store a result in both cache tiers"""
+    # Don't cache failed classifications - they may succeed on retry
+    if result.error:
+        return
+    _mem_put(key, result)
+    _disk_put(key, result)
+
+
+def _simhash(text):
+    """Compute a 64-bit SimHash over the lowercased token bag"""
+    weights = [0] * 64
+    for token in text.lower().split():
+        h = int.from_bytes(hashlib.md5(token.encode('utf-8')).digest()[:8], 'big')
+        for bit in range(64):
+            if (h >> bit) & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    value = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value
+
+
+def _fuzzy_get(simhash):
+    """Find a recent result whose SimHash is within Hamming distance"""
+    global _fuzzy_hits
+    for cached_hash, result in _fuzzy_recent:
+        if bin(simhash ^ cached_hash).count('1') < FUZZY_MAX_DISTANCE:
+            _fuzzy_hits += 1
+            return result
+    return None
+
+
+def _classify_texts(texts):
+    """Classify a list of texts, serving cache hits and deduplicating
+    repeated texts so each distinct text is classified only once"""
+    global _cache_hits, _cache_misses
+    results = [None] * len(texts)
+    keys = [_text_hash(text) for text in texts]
+
+    mem_misses = []
+    for i, key in enumerate(keys):
+        cached = _mem_get(key)
+        if cached is not None:
+            _cache_hits += 1
+            results[i] = cached
+        else:
+            mem_misses.append(i)
+
+    # One batched query against the shared on-disk tier for everything the
+    # in-memory LRU didn't have
+    miss_indices = []
+    disk_hits = _disk_get_many([keys[i] for i in mem_misses])
+    for i in mem_misses:
+        cached = disk_hits.get(keys[i])
+        if cached is not None:
+            _cache_hits += 1
+            _mem_put(keys[i], cached)
+            results[i] = cached
+        else:
+            _cache_misses += 1
+            miss_indices.append(i)
+
+    if miss_indices:
+        # Classify each distinct text once, then fan the result back out
+        # to every position it occupied in the original list. Grouping
+        # positions in a single pass keeps dedup at O(n).
+        groups = defaultdict(list)
+        for i in miss_indices:
+            groups[texts[i]].append(i)
+        # The classifier calls are I/O-bound (waiting on OpenAI), so
+        # dispatch them concurrently instead of one round-trip at a time.
+        # executor.map preserves input order.
+        unique_texts = list(groups.keys())
+        with ThreadPoolExecutor(max_workers=min(16, len(unique_texts))) as executor:
+            unique_results = list(executor.map(classifier.classify, unique_texts))
+        for (text, indices), result in zip(groups.items(), unique_results):
+            _cache_put(_text_hash(text), result)
+            for i in indices:
+                results[i] = result
+
+    response = []
+    for result in results:
+        item = {
+            'text': result.text,
+            'predicted_label': result.predicted_label,
+            'confidence': result.confidence,
+            'rationale': result.rationale
+        }
+        if result.error:
+            item['error'] = result.error
+        response.append(item)
+    return response
+
+def _warmup_classifier():
+    """Make one cheap classification so the first real request hits a warm
+    HTTPS connection pool, and prime the cache with the result"""
+    try:
+        result = classifier.classify("hello")
+        _cache_put(_text_hash("hello"), result)
+    except Exception:
+        # Warmup is best-effort; failures surface on real requests
+        pass
+
+
+def init_classifier():
+    """Initialize the text classifier"""
+    global classifier
+    try:
+        # The UI displays confidence and rationale, so keep verbose output
+        classifier = TextClassifier(verbose=True)
+    except Exception as e:
+        return False, str(e)
+
+    # Warm up in the background so startup isn't blocked on the API call
+    threading.Thread(target=_warmup_classifier, daemon=True).start()
+
+    app.config['CLASSIFIER_READY'] = True
+    # Labels and model never change after init, so the status payload can
+    # be serialized once and served as-is
+    app.config['STATUS_JSON'] = orjson.dumps({
+        'status': 'ready',
+        'labels': classifier.labels,
+        'model': classifier.model
+    })
+    return True, "Classifier initialized successfully"
+
+
+def _ensure_classifier():
+    """Lazily initialize the classifier; returns an error response on failure"""
+    if app.config.get('CLASSIFIER_READY'):
+        return None
+    success, message = init_classifier()
+    if not success:
+        return _json({'error': f'Failed to initialize classifier: {message}'}, status=500)
+    return None
+
+@app.route('/')
+def index():
+    """Main page"""
+    return render_template('index.html')
+
+@app.route('/api/classify', methods=['POST'])
+def classify_text():
+    """Classify a single text"""
+    error = _ensure_classifier()
+    if error:
+        return error
+
+    data = request.get_json()
+    text = data.get('text', '').strip()
+    
+    if not text:
+        return _error_response(ERR_NO_TEXT)
+    
+    try:
+        key = _text_hash(text)
+        result = _cache_get(key)
+        if result is None:
+            # Exact miss - check for a near-duplicate before going to the API
+            simhash = _simhash(text)
+            result = _fuzzy_get(simhash)
+            if result is None:
+                result = classifier.classify(text)
+                _cache_put(key, result)
+                if not result.error:
+                    _fuzzy_recent.append((simhash, result))
+
+        response = {
+            'text': result.text,
+            'predicted_label': result.predicted_label,
+            'confidence': result.confidence,
+            'rationale': result.rationale
+        }
+        
+        if result.error:
+            response['error'] = result.error
+
+        return _json(response)
+    
+    except Exception as e:
+        return _json({'error': str(e)}, status=500)
+
+@app.route('/api/classify-batch', methods=['POST'])
+def classify_batch():
+    """Classify multiple texts"""
+    error = _ensure_classifier()
+    if error:
+        return error
+
+    data = request.get_json()
+    texts = data.get('texts', [])
+    
+    if not texts or not isinstance(texts, list):
+        return _error_response(ERR_NO_TEXTS)
+    
+    if len(texts) > 100:  # Limit batch size
+        return _error_response(ERR_BATCH_LIMIT)
+    
+    try:
+        response = _classify_texts(texts)
+        return _json({'results': response, 'count': len(response)})
+
+    except Exception as e:
+        return _json({'error': str(e)}, status=500)
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Get classification cache statistics"""
+    return _json({
+        'hits': _cache_hits,
+        'misses': _cache_misses,
+        'fuzzy_hits': _fuzzy_hits,
+        'size': len(_cache),
+        'maxsize': CACHE_MAXSIZE
+    })
+
+@app.route('/api/classify-file', methods=['POST'])
+def classify_file():
+    """Classify texts from uploaded file"""
+    error = _ensure_classifier()
+    if error:
+        return error
+
+    if 'file' not in request.files:
+        return _error_response(ERR_NO_FILE)
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return _error_response(ERR_NO_FILE_SELECTED)
+    
+    try:
+        # Decode incrementally off the upload stream instead of buffering
+        # the whole file (up to 16MB) into one string
+        stream = io.TextIOWrapper(file.stream, encoding='utf-8')
+        # Sniff the first non-whitespace character: only payloads that can
+        # actually be JSON are handed to the JSON parser
+        first = stream.read(1)
+        while first and first.isspace():
+            first = stream.read(1)
+
+        if first in ('[', '{'):
+            # Looks like JSON - parse the full payload
+            content = first + stream.read()
+            try:
+                data = orjson.loads(content)
+                if isinstance(data, list):
+                    texts = [str(t) for t in data]
+                else:
+                    texts = [content]
+            except orjson.JSONDecodeError:
+                # Treat as line-separated text
+                texts = [line.strip() for line in content.splitlines() if line.strip()]
+
+            if len(texts) > 100:
+                return _error_response(ERR_FILE_LIMIT)
+        else:
+            # Line-separated text: read lazily and stop as soon as the
+            # batch limit is exceeded rather than materializing every line
+            texts = []
+            line = (first + stream.readline()).strip()
+            if line:
+                texts.append(line)
+            for line in stream:
+                line = line.strip()
+                if line:
+                    texts.append(line)
+                    if len(texts) > 100:
+                        return _error_response(ERR_FILE_LIMIT)
+
+        if not texts:
+            return _error_response(ERR_NO_FILE_TEXTS)
+
+        # Classify
+        response = _classify_texts(texts)
+        return _json({'results': response, 'count': len(response)})
+
+    except UnicodeDecodeError:
+        # The incremental decoder raises as soon as a bad byte is hit -
+        # a malformed upload is a client error, not a server failure
+        return _error_response(ERR_NOT_UTF8)
+    except Exception as e:
+        return _json({'error': str(e)}, status=500)
+
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    """Get classifier status"""
+    if not app.config.get('CLASSIFIER_READY'):
+        success, message = init_classifier()
+        if not success:
+            return _json({
+                'status': 'error',
+                'message': message,
+                'labels': []
+            })
+
+    return Response(app.config['STATUS_JSON'], mimetype='application/json')
+
+@app.route('/api/download-results', methods=['POST'])
+def download_results():
+    """Download classification results as JSON"""
+    data = request.get_json()
+    results = data.get('results', [])
+    
+    if not results:
+        return _error_response(ERR_NO_RESULTS)
+    
+    # The results are already in memory - serialize once and send the
+    # bytes directly instead of bouncing them through a tempfile
+    return Response(
+        orjson.dumps(results, option=orjson.OPT_INDENT_2),
+        mimetype='application/json',
+        headers={'Content-Disposition': 'attachment; filename=classification_results.json'}
+    )
+
+if __name__ == '__main__':
+    # Initialize classifier on startup
+    init_classifier()
+    
+    # Run the app
+    app.run(debug=True, host='0.0.0.0', port=5000)
+
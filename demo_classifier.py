@@ -9,6 +9,8 @@ import json
 import sys
 from datetime import datetime
 
+import numpy as np
+
 # Fix encoding for Windows console
 if sys.platform == 'win32':
     import codecs
@@ -93,9 +95,8 @@ def demo_classification():
     print("=" * 80)
     print()
     
-    correct = 0
     total = len(demo_results)
-    
+
     # Expected labels for accuracy calculation
     expected_labels = {
         0: "Complaint",
@@ -110,15 +111,18 @@ def demo_classification():
         9: "Complaint"
     }
     
+    # Vectorized accuracy: one equality pass instead of a Python-level
+    # comparison per result
+    predicted_arr = np.array([r["predicted_label"] for r in demo_results], dtype=object)
+    expected_arr = np.array([expected_labels[i] for i in range(total)], dtype=object)
+    matches = predicted_arr == expected_arr
+    correct = int(matches.sum())
+
     for i, result in enumerate(demo_results, 1):
         expected = expected_labels[i-1]
         predicted = result["predicted_label"]
-        match = predicted == expected
-        status = "[OK]" if match else "[X]"
-        
-        if match:
-            correct += 1
-        
+        status = "[OK]" if matches[i-1] else "[X]"
+
         print(f"Test {i}/{total} {status}")
         print(f"Text: {result['text'][:70]}..." if len(result['text']) > 70 else f"Text: {result['text']}")
         print(f"Expected: {expected}")
@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for the Text Classification Tool web UI
+"""
+
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+
+# The app spends most of its time waiting on OpenAI HTTP calls, so gevent
+# workers give ~N concurrent requests per worker instead of one
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = "gevent"
+worker_connections = 1000
+timeout = 120
+
+
+def post_worker_init(worker):
+    """Initialize and warm the classifier when a worker starts instead of
+    on its first request"""
+    from app import init_classifier
+    init_classifier()
@@ -3,6 +3,8 @@
 Simple script to run the web UI
 """
 
+import os
+
 from app import app, init_classifier
 
 if __name__ == '__main__':
@@ -30,6 +32,7 @@ if __name__ == '__main__':
     print("=" * 60)
     print()
     
-    # Run the app
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Serve with gunicorn + gevent workers instead of the single-threaded
+    # Flask dev server so concurrent OpenAI calls don't queue behind each other
+    os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn.conf.py", "app:app"])
 
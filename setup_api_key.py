@@ -37,25 +37,20 @@ def setup_api_key():
     env_file = Path('.env')
     
     if env_file.exists():
-        # Read existing content
-        with open(env_file, 'r') as f:
-            content = f.read()
-        
-        # Replace existing key or add new one
-        if 'OPENAI_API_KEY=' in content:
-            lines = content.split('\n')
-            new_lines = []
-            for line in lines:
-                if line.startswith('OPENAI_API_KEY='):
-                    new_lines.append(f'OPENAI_API_KEY={api_key}')
-                else:
-                    new_lines.append(line)
-            content = '\n'.join(new_lines)
-        else:
-            content += f'\nOPENAI_API_KEY={api_key}\n'
-        
-        with open(env_file, 'w') as f:
-            f.write(content)
+        # Replace the existing key (or append it) in a single pass:
+        # one read, one scan, one write
+        key_line = f'OPENAI_API_KEY={api_key}'
+        replaced = False
+        updated = []
+        for line in env_file.read_text().splitlines():
+            if line.startswith('OPENAI_API_KEY='):
+                updated.append(key_line)
+                replaced = True
+            else:
+                updated.append(line)
+        if not replaced:
+            updated.append(key_line)
+        env_file.write_text('\n'.join(updated) + '\n')
     else:
         # Create new .env file
         with open(env_file, 'w') as f:
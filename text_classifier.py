@@ -1,378 +1,1217 @@
-#!/usr/bin/env python3
-"""
-Text Classification Tool
-Classifies text into predefined categories using OpenAI API.
-Supports single text and batch processing with deterministic prompts.
-"""
-
-import json
-import os
-import sys
-from typing import List, Dict, Optional, Union
-from dataclasses import dataclass, asdict
-from pathlib import Path
-
-try:
-    from openai import OpenAI
-    from dotenv import load_dotenv
-except ImportError:
-    print("Error: Required packages not installed. Run: pip install -r requirements.txt")
-    sys.exit(1)
-
-# Load environment variables
-load_dotenv()
-
-
-@dataclass
-class ClassificationResult:
-    """Structure for classification results"""
-    text: str
-    predicted_label: str
-    confidence: Optional[float] = None
-    rationale: Optional[str] = None
-    error: Optional[str] = None
-
-
-class TextClassifier:
-    """Text classification using OpenAI API with deterministic prompts"""
-    
-    def __init__(
-        self,
-        api_key: Optional[str] = None,
-        model: str = "gpt-3.5-turbo",
-        labels: Optional[List[str]] = None,
-        config_file: Optional[str] = None
-    ):
-        """
-        Initialize the text classifier.
-        
-        Args:
-            api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
-            model: OpenAI model to use (default: gpt-3.5-turbo)
-            labels: List of classification labels (defaults to config or standard set)
-            config_file: Path to JSON config file with labels and prompt template
-        """
-        # Load API key
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError(
-                "OpenAI API key not found. Set OPENAI_API_KEY environment variable "
-                "or pass api_key parameter."
-            )
-        
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = model
-        
-        # Load configuration
-        if config_file and Path(config_file).exists():
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                self.labels = config.get('labels', labels or self._default_labels())
-                self.prompt_template = config.get('prompt_template', self._default_prompt_template())
-        else:
-            self.labels = labels or self._default_labels()
-            self.prompt_template = self._default_prompt_template()
-        
-        # Validate labels
-        if not self.labels or len(self.labels) < 2:
-            raise ValueError("At least 2 labels are required for classification")
-    
-    @staticmethod
-    def _default_labels() -> List[str]:
-        """Default classification labels"""
-        return ["Complaint", "Inquiry", "Feedback", "Other"]
-    
-    @staticmethod
-    def _default_prompt_template() -> str:
-        """Default deterministic prompt template"""
-        return """You are a text classification system. Classify the following text into exactly one of these categories: {labels}
-
-Classification Rules:
-- Complaint: Expresses dissatisfaction, problems, or negative experiences
-- Inquiry: Asks questions, seeks information, or requests clarification
-- Feedback: Provides suggestions, opinions, or general comments (positive or constructive)
-- Other: Does not fit into the above categories
-
-Text to classify: "{text}"
-
-Respond with a JSON object containing:
-1. "label": The exact category name (must match one of: {labels})
-2. "confidence": A number between 0.0 and 1.0 indicating classification confidence
-3. "rationale": A brief explanation (1-2 sentences) of why this classification was chosen
-
-Response format (JSON only, no additional text):"""
-    
-    def _build_prompt(self, text: str) -> str:
-        """Build the classification prompt"""
-        labels_str = ", ".join(self.labels)
-        return self.prompt_template.format(
-            labels=labels_str,
-            text=text
-        )
-    
-    def _parse_response(self, response_text: str) -> Dict:
-        """Parse OpenAI response and extract classification data"""
-        try:
-            # Try to extract JSON from response
-            response_text = response_text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
-            
-            # Parse JSON
-            result = json.loads(response_text)
-            
-            # Validate structure
-            if "label" not in result:
-                raise ValueError("Response missing 'label' field")
-            
-            # Validate label matches one of our categories
-            if result["label"] not in self.labels:
-                # Try case-insensitive match
-                label_lower = result["label"].lower()
-                matching_label = next(
-                    (l for l in self.labels if l.lower() == label_lower),
-                    None
-                )
-                if matching_label:
-                    result["label"] = matching_label
-                else:
-                    raise ValueError(
-                        f"Invalid label '{result['label']}'. Must be one of: {self.labels}"
-                    )
-            
-            return {
-                "predicted_label": result["label"],
-                "confidence": result.get("confidence"),
-                "rationale": result.get("rationale")
-            }
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse JSON response: {e}")
-        except Exception as e:
-            raise ValueError(f"Error parsing response: {e}")
-    
-    def classify(self, text: str) -> ClassificationResult:
-        """
-        Classify a single text.
-        
-        Args:
-            text: Text to classify
-            
-        Returns:
-            ClassificationResult object
-        """
-        if not text or not text.strip():
-            return ClassificationResult(
-                text=text,
-                predicted_label="Other",
-                error="Empty text provided"
-            )
-        
-        try:
-            prompt = self._build_prompt(text)
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a precise text classification assistant. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.0,  # Deterministic output
-                max_tokens=200,
-                response_format={"type": "json_object"}  # Force JSON response
-            )
-            
-            response_text = response.choices[0].message.content
-            parsed = self._parse_response(response_text)
-            
-            return ClassificationResult(
-                text=text,
-                predicted_label=parsed["predicted_label"],
-                confidence=parsed.get("confidence"),
-                rationale=parsed.get("rationale")
-            )
-        
-        except Exception as e:
-            return ClassificationResult(
-                text=text,
-                predicted_label="Other",
-                error=str(e)
-            )
-    
-    def classify_batch(self, texts: List[str]) -> List[ClassificationResult]:
-        """
-        Classify multiple texts in batch.
-        
-        Args:
-            texts: List of texts to classify
-            
-        Returns:
-            List of ClassificationResult objects
-        """
-        results = []
-        for text in texts:
-            result = self.classify(text)
-            results.append(result)
-        return results
-
-
-def main():
-    """Command-line interface"""
-    import argparse
-    
-    parser = argparse.ArgumentParser(
-        description="Text Classification Tool using OpenAI API"
-    )
-    parser.add_argument(
-        "input",
-        nargs="?",
-        help="Text to classify (or use --file for batch processing)"
-    )
-    parser.add_argument(
-        "--file",
-        type=str,
-        help="Path to file containing texts (one per line or JSON array)"
-    )
-    parser.add_argument(
-        "--config",
-        type=str,
-        help="Path to configuration JSON file"
-    )
-    parser.add_argument(
-        "--model",
-        type=str,
-        default="gpt-3.5-turbo",
-        help="OpenAI model to use (default: gpt-3.5-turbo)"
-    )
-    parser.add_argument(
-        "--output",
-        type=str,
-        help="Output file path (default: stdout)"
-    )
-    parser.add_argument(
-        "--labels",
-        nargs="+",
-        help="Custom labels (overrides config file)"
-    )
-    
-    args = parser.parse_args()
-    
-    # Initialize classifier
-    try:
-        classifier = TextClassifier(
-            model=args.model,
-            labels=args.labels,
-            config_file=args.config
-        )
-    except Exception as e:
-        print(f"Error initializing classifier: {e}", file=sys.stderr)
-        sys.exit(1)
-    
-    # Process input
-    results = []
-    
-    if args.file:
-        # Batch processing from file
-        try:
-            with open(args.file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-                # Try JSON array first
-                try:
-                    texts = json.loads(content)
-                    if isinstance(texts, list):
-                        texts = [str(t) for t in texts]
-                    else:
-                        texts = [content]
-                except json.JSONDecodeError:
-                    # Fall back to line-by-line
-                    texts = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            results = classifier.classify_batch(texts)
-        except FileNotFoundError:
-            print(f"Error: File not found: {args.file}", file=sys.stderr)
-            sys.exit(1)
-        except Exception as e:
-            print(f"Error reading file: {e}", file=sys.stderr)
-            sys.exit(1)
-    
-    elif args.input:
-        # Single text classification
-        result = classifier.classify(args.input)
-        results = [result]
-    
-    else:
-        # Interactive mode
-        print("Text Classifier - Interactive Mode")
-        print("Enter text to classify (or 'quit' to exit):")
-        print(f"Available labels: {', '.join(classifier.labels)}\n")
-        
-        while True:
-            try:
-                text = input("> ").strip()
-                if text.lower() in ['quit', 'exit', 'q']:
-                    break
-                if not text:
-                    continue
-                
-                result = classifier.classify(text)
-                output = {
-                    "text": result.text,
-                    "predicted_label": result.predicted_label,
-                    "confidence": result.confidence,
-                    "rationale": result.rationale
-                }
-                if result.error:
-                    output["error"] = result.error
-                
-                print(json.dumps(output, indent=2, ensure_ascii=False))
-                print()
-            except KeyboardInterrupt:
-                print("\nExiting...")
-                break
-            except Exception as e:
-                print(f"Error: {e}", file=sys.stderr)
-        
-        sys.exit(0)
-    
-    # Format output
-    output_data = []
-    for result in results:
-        item = {
-            "text": result.text,
-            "predicted_label": result.predicted_label
-        }
-        if result.confidence is not None:
-            item["confidence"] = result.confidence
-        if result.rationale:
-            item["rationale"] = result.rationale
-        if result.error:
-            item["error"] = result.error
-        output_data.append(item)
-    
-    # Output results
-    output_json = json.dumps(output_data, indent=2, ensure_ascii=False)
-    
-    if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(output_json)
-        print(f"Results written to {args.output}")
-    else:
-        print(output_json)
-
-
-if __name__ == "__main__":
-    main()
-
+#!/usr/bin/env python3
+"""
+Text Classification Tool
+Classifies text into predefined categories using OpenAI API.
+Supports single text and batch processing with deterministic prompts.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+# Heavy third-party imports (openai, httpx, numpy) are deferred to
+# _load_dependencies() so `--help` and argparse errors stay instant
+httpx = None
+np = None
+OpenAI = None
+AsyncOpenAI = None
+APIError = None
+RateLimitError = None
+load_dotenv = None
+
+
+def _load_dependencies() -> None:
+    """Import the heavy dependencies on first classifier construction"""
+    global httpx, np, OpenAI, AsyncOpenAI, APIError, RateLimitError, load_dotenv
+    if OpenAI is not None:
+        return
+    try:
+        import httpx as _httpx
+        import numpy as _np
+        import openai as _openai
+        from dotenv import load_dotenv as _load_dotenv
+    except ImportError:
+        print("Error: Required packages not installed. Run: pip install -r requirements.txt")
+        sys.exit(1)
+    httpx = _httpx
+    np = _np
+    OpenAI = _openai.OpenAI
+    AsyncOpenAI = _openai.AsyncOpenAI
+    APIError = _openai.APIError
+    RateLimitError = _openai.RateLimitError
+    load_dotenv = _load_dotenv
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import diskcache
+except ImportError:
+    # Optional: without it results are only cached for the process lifetime
+    diskcache = None
+
+try:
+    import tiktoken
+except ImportError:
+    # Optional: without it over-length texts fail at the API instead of
+    # being rejected locally
+    tiktoken = None
+
+
+def _json_loads(data):
+    """Parse JSON with orjson when available (several times faster)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> str:
+    """Serialize compact JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _json_dumps_indent(obj) -> str:
+    """Serialize indented JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _result_record(result) -> Dict:
+    """Output dict for one result, pruning unset optional fields
+    ("text" and "predicted_label" are always kept)"""
+    return {
+        field: value
+        for field, value in asdict(result).items()
+        if value is not None or field in ("text", "predicted_label")
+    }
+
+# Retry policy for rate-limited/failed API calls in the async batch path
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0  # seconds, doubled per attempt
+
+# How many texts to pack into one completion call during batch runs
+MICROBATCH_SIZE = 20
+
+# Matches a response wrapped in a markdown code fence (``` or ```json)
+# and captures the body
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*```\s*$', re.DOTALL)
+
+# Response cache bounds and the semantic-similarity tier settings
+CACHE_MAXSIZE = 4096
+DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "text_classifier")
+DISK_CACHE_TTL = 30 * 86400  # classifications are stable; keep them a month
+
+# Conservative context budget (prompt + completion) for the supported
+# chat models; texts that would overflow it are rejected locally
+MAX_PROMPT_TOKENS = 16000
+
+# Client-side rate budgets, matching the default gpt-3.5-turbo tier;
+# staying under them avoids 429s and the backoff sleeps they trigger
+RATE_LIMIT_RPM = 3500
+RATE_LIMIT_TPM = 90000
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_SIM_THRESHOLD = 0.95
+
+
+@dataclass
+class ClassificationResult:
+    """Structure for classification results"""
+    text: str
+    predicted_label: str
+    confidence: Optional[float] = None
+    rationale: Optional[str] = None
+    error: Optional[str] = None
+
+
+class DualRateLimiter:
+    """Token-bucket limiter covering both OpenAI quota axes.
+
+    OpenAI enforces requests-per-minute and tokens-per-minute separately;
+    acquire() waits until both buckets can cover a call, so bursts stay
+    under the account limits instead of bouncing off 429 responses.
+
+    State is only mutated between awaits, so no lock is needed within a
+    single event loop, and no loop-bound primitives are held - the same
+    limiter works across successive asyncio.run() calls.
+    """
+
+    def __init__(self, rpm: int = RATE_LIMIT_RPM, tpm: int = RATE_LIMIT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Credit both buckets for the time elapsed since the last call"""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, estimated_tokens: int = 0) -> None:
+        """Wait until one request and estimated_tokens fit both budgets"""
+        # An estimate larger than the bucket could never be satisfied
+        # (e.g. a micro-batch of near-limit texts); cap it at capacity so
+        # such calls drain a full bucket instead of hanging forever
+        estimated_tokens = min(estimated_tokens, self.tpm)
+        while True:
+            self._refill()
+            if self._requests >= 1.0 and self._tokens >= estimated_tokens:
+                self._requests -= 1.0
+                self._tokens -= estimated_tokens
+                return
+            wait = max(
+                (1.0 - self._requests) * 60.0 / self.rpm,
+                (estimated_tokens - self._tokens) * 60.0 / self.tpm,
+                0.01
+            )
+            await asyncio.sleep(wait)
+
+
+class TextClassifier:
+    """Text classification using OpenAI API with deterministic prompts"""
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        labels: Optional[List[str]] = None,
+        config_file: Optional[str] = None,
+        max_concurrency: int = 32,
+        semantic_cache: bool = False,
+        verbose: bool = False
+    ):
+        """
+        Initialize the text classifier.
+
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
+            model: OpenAI model to use (default: gpt-3.5-turbo)
+            labels: List of classification labels (defaults to config or standard set)
+            config_file: Path to JSON config file with labels and prompt template
+            max_concurrency: Maximum in-flight API calls during batch classification
+            semantic_cache: Also reuse results for near-identical texts by
+                embedding them and matching on cosine similarity (one cheap
+                embedding call instead of a full completion)
+            verbose: Ask the model for confidence and rationale in addition
+                to the label. Off by default - output tokens dominate
+                completion latency, and the label alone decodes in a
+                handful of tokens
+        """
+        _load_dependencies()
+
+        # Load API key, consulting .env only when none was passed in
+        if api_key is None:
+            load_dotenv()
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError(
+                "OpenAI API key not found. Set OPENAI_API_KEY environment variable "
+                "or pass api_key parameter."
+            )
+        
+        # Explicit pooled HTTP clients so every call reuses warm TCP+TLS
+        # connections instead of paying handshake latency; HTTP/2 lets
+        # concurrent batch requests multiplex over a single connection
+        limits = httpx.Limits(
+            max_keepalive_connections=64,
+            max_connections=128,
+            keepalive_expiry=600
+        )
+        self.client = OpenAI(
+            api_key=self.api_key,
+            http_client=httpx.Client(limits=limits, http2=True, timeout=30.0)
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=httpx.AsyncClient(limits=limits, http2=True, timeout=30.0)
+        )
+        self.model = model
+        self.max_concurrency = max_concurrency
+
+        # Exact-match response cache: SHA-256(model + prompt) -> parsed
+        # result dict, so identical texts never repeat a completion call
+        self.semantic_cache = semantic_cache
+        self._exact_cache = OrderedDict()
+        # Disk tier: survives process restarts and is shared across runs
+        self._disk_cache = None
+        if diskcache is not None:
+            try:
+                self._disk_cache = diskcache.Cache(DISK_CACHE_DIR)
+            except OSError:
+                pass
+        # Normalized embeddings (and their results) backing the semantic tier
+        self._embeddings = []
+        self._embedding_results = []
+        
+        self.verbose = verbose
+        default_template = (
+            self._default_prompt_template() if verbose
+            else self._minimal_prompt_template()
+        )
+
+        # Load configuration
+        custom_template = None
+        if config_file and Path(config_file).exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = _json_loads(f.read())
+                self.labels = config.get('labels', labels or self._default_labels())
+                custom_template = config.get('prompt_template')
+        else:
+            self.labels = labels or self._default_labels()
+        self.prompt_template = custom_template or default_template
+
+        # Custom templates may ask for fuller output, so the decode budget
+        # only shrinks for the built-in label-only prompt
+        self._label_only = not verbose and custom_template is None
+        self.max_tokens = 10 if self._label_only else 200
+        
+        # Validate labels
+        if not self.labels or len(self.labels) < 2:
+            raise ValueError("At least 2 labels are required for classification")
+
+        # Split the template once around {text}: the static part in front
+        # becomes a constant system message, so the API sees an identical
+        # prompt prefix on every request and can reuse its KV cache. Any
+        # template content after {text} stays in the user message.
+        labels_str = ", ".join(self.labels)
+        prefix, _, suffix = self.prompt_template.replace("{labels}", labels_str).partition("{text}")
+        # Labels never change after construction, so the template is
+        # specialized once and _build_prompt is reduced to concatenation
+        self._prompt_prefix = prefix
+        self._prompt_suffix = suffix
+        self._system_prompt = (
+            "You are a precise text classification assistant. "
+            "Always respond with valid JSON only.\n\n" + prefix.rstrip()
+        )
+        self._user_suffix = suffix.rstrip()
+
+        # Static system message for micro-batched requests (also constant,
+        # so it stays prompt-cache friendly)
+        self._microbatch_system_prompt = (
+            "You are a precise text classification assistant. "
+            "Always respond with valid JSON only.\n\n"
+            f"Classify each numbered text into exactly one of these categories: {labels_str}\n\n"
+            'Respond with a JSON object of the form '
+            '{"results": [{"index": <number>, "label": "<category>"}, ...]} '
+            "containing one entry for every text."
+        )
+
+        # Token pre-filter: the template overhead is counted once here so
+        # per-text checks only have to encode the text itself
+        self._enc = None
+        self._prompt_overhead_tokens = 0
+        self._token_pool = None
+        if tiktoken is not None:
+            try:
+                self._enc = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._enc = tiktoken.get_encoding("cl100k_base")
+            self._prompt_overhead_tokens = (
+                len(self._enc.encode(self._system_prompt))
+                + len(self._enc.encode(self._user_suffix))
+            )
+            # tiktoken releases the GIL while encoding, so batch counts
+            # can spread across cores (workers start lazily on first use)
+            self._token_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+        # Paces async dispatch under the account's request and token quotas
+        self._rate_limiter = DualRateLimiter()
+
+        # Label matching is O(1) against these instead of scanning the list
+        self._label_set = set(self.labels)
+        self._label_lookup = {l.lower(): l for l in self.labels}
+
+        # Fast-path extractor for label-only responses: pulls the label
+        # straight out of the JSON text without a full parse
+        self._label_re = re.compile(
+            r'"label"\s*:\s*"(' + "|".join(re.escape(l) for l in self.labels) + r')"',
+            re.IGNORECASE
+        )
+    
+    @staticmethod
+    def _default_labels() -> List[str]:
+        """Default classification labels"""
+        return ["Complaint", "Inquiry", "Feedback", "Other"]
+    
+    @staticmethod
+    def _default_prompt_template() -> str:
+        """Default deterministic prompt template.
+
+        The static instructions come first and {text} is the very last
+        element so that every request shares the longest possible prompt
+        prefix - the condition for server-side prompt (KV) caching.
+        """
+        return """You are a text classification system. Classify the following text into exactly one of these categories: {labels}
+
+Classification Rules:
+- Complaint: Expresses dissatisfaction, problems, or negative experiences
+- Inquiry: Asks questions, seeks information, or requests clarification
+- Feedback: Provides suggestions, opinions, or general comments (positive or constructive)
+- Other: Does not fit into the above categories
+
+Respond with a JSON object containing:
+1. "label": The exact category name (must match one of: {labels})
+2. "confidence": A number between 0.0 and 1.0 indicating classification confidence
+3. "rationale": A brief explanation (1-2 sentences) of why this classification was chosen
+
+Respond with JSON only, no additional text.
+
+Text to classify:
+{text}"""
+
+    @staticmethod
+    def _minimal_prompt_template() -> str:
+        """Label-only prompt used when verbose output is disabled"""
+        return """You are a text classification system. Classify the following text into exactly one of these categories: {labels}
+
+Classification Rules:
+- Complaint: Expresses dissatisfaction, problems, or negative experiences
+- Inquiry: Asks questions, seeks information, or requests clarification
+- Feedback: Provides suggestions, opinions, or general comments (positive or constructive)
+- Other: Does not fit into the above categories
+
+Respond with a JSON object containing only:
+1. "label": The exact category name (must match one of: {labels})
+
+Respond with JSON only, no additional text.
+
+Text to classify:
+{text}"""
+
+    def _build_prompt(self, text: str) -> str:
+        """Build the classification prompt by joining the precomputed
+        template halves around the text"""
+        return self._prompt_prefix + text + self._prompt_suffix
+
+    def _build_messages(self, text: str) -> List[Dict]:
+        """Build the chat messages: a constant system block plus a short
+        per-text user message, keeping the shared prefix cache-friendly"""
+        return [
+            {"role": "system", "content": self._system_prompt},
+            {"role": "user", "content": text + self._user_suffix}
+        ]
+    
+    def _build_microbatch_messages(self, chunk: List[str]) -> List[Dict]:
+        """Build the chat messages for one micro-batched chunk"""
+        numbered = "\n".join(f"{i}) {text}" for i, text in enumerate(chunk))
+        return [
+            {"role": "system", "content": self._microbatch_system_prompt},
+            {"role": "user", "content": "Texts:\n" + numbered}
+        ]
+
+    def _match_label(self, label: str) -> Optional[str]:
+        """Map a model-provided label onto the configured label set,
+        falling back to a case-insensitive match"""
+        if label in self._label_set:
+            return label
+        return self._label_lookup.get(label.lower())
+
+    def _parse_response(self, response_text: str) -> Dict:
+        """Parse OpenAI response and extract classification data"""
+        # Label-only responses carry no confidence or rationale, so a
+        # single regex match replaces the JSON round-trip
+        if self._label_only:
+            match = self._label_re.search(response_text)
+            if match:
+                return {
+                    "predicted_label": self._match_label(match.group(1)),
+                    "confidence": None,
+                    "rationale": None
+                }
+        try:
+            # Remove a markdown code fence if present, otherwise just trim
+            match = _FENCE_RE.match(response_text)
+            response_text = match.group(1) if match else response_text.strip()
+
+            # Parse JSON
+            result = _json_loads(response_text)
+            
+            # Validate structure
+            if "label" not in result:
+                raise ValueError("Response missing 'label' field")
+            
+            # Validate label matches one of our categories
+            matched = self._match_label(result["label"])
+            if matched is None:
+                raise ValueError(
+                    f"Invalid label '{result['label']}'. Must be one of: {self.labels}"
+                )
+            result["label"] = matched
+            
+            return {
+                "predicted_label": result["label"],
+                "confidence": result.get("confidence"),
+                "rationale": result.get("rationale")
+            }
+        except ValueError as e:
+            # Covers json.JSONDecodeError and orjson.JSONDecodeError
+            raise ValueError(f"Failed to parse JSON response: {e}")
+        except Exception as e:
+            raise ValueError(f"Error parsing response: {e}")
+    
+    def _input_too_long(self, text: str) -> bool:
+        """Check locally whether a text would overflow the model context,
+        so the failure costs no network round trip"""
+        if self._enc is None:
+            return False
+        return (
+            self._prompt_overhead_tokens
+            + len(self._enc.encode(text))
+            + self.max_tokens
+        ) > MAX_PROMPT_TOKENS
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough prompt-plus-completion token estimate for rate limiting"""
+        if self._enc is not None:
+            text_tokens = len(self._enc.encode(text))
+        else:
+            text_tokens = len(text) // 4 + 1
+        return self._prompt_overhead_tokens + text_tokens + self.max_tokens
+
+    def _input_too_long_many(self, texts: List[str]) -> List[bool]:
+        """Apply the token pre-filter to a batch of texts on the thread
+        pool, so the counts run in parallel across cores"""
+        if self._enc is None:
+            return [False] * len(texts)
+        if len(texts) == 1:
+            return [self._input_too_long(texts[0])]
+        return list(self._token_pool.map(self._input_too_long, texts))
+
+    def _length_error(self, text: str) -> ClassificationResult:
+        """Result returned for texts rejected by the token pre-filter"""
+        return ClassificationResult(
+            text=text,
+            predicted_label="Other",
+            error=f"Input exceeds the model context budget ({MAX_PROMPT_TOKENS} tokens)"
+        )
+
+    def _cache_key(self, text: str) -> str:
+        """Cache key covering the model, prompt template and text"""
+        prompt = self._build_prompt(text)
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.model}:{digest}"
+
+    def _cache_lookup(self, key: str) -> Optional[Dict]:
+        """Look up a parsed result in memory, then on disk"""
+        parsed = self._exact_cache.get(key)
+        if parsed is not None:
+            self._exact_cache.move_to_end(key)
+            return parsed
+        if self._disk_cache is not None:
+            parsed = self._disk_cache.get(key)
+            if parsed is not None:
+                # Promote to the memory tier for the rest of this run
+                self._exact_cache[key] = parsed
+                while len(self._exact_cache) > CACHE_MAXSIZE:
+                    self._exact_cache.popitem(last=False)
+        return parsed
+
+    def _cache_store(self, key: str, parsed: Dict) -> None:
+        """Store a parsed result in both tiers, evicting the oldest
+        memory entry when full"""
+        self._exact_cache[key] = parsed
+        self._exact_cache.move_to_end(key)
+        while len(self._exact_cache) > CACHE_MAXSIZE:
+            self._exact_cache.popitem(last=False)
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, parsed, expire=DISK_CACHE_TTL)
+
+    def _semantic_lookup(self, text: str):
+        """Embed a text and search previous embeddings for a near match.
+
+        Returns (embedding, parsed result or None). The embedding call is
+        an order of magnitude cheaper than a completion, so a hit still
+        saves most of the cost and all of the decode latency.
+        """
+        response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        embedding = np.asarray(response.data[0].embedding)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+
+        if self._embeddings:
+            similarities = np.stack(self._embeddings) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] > SEMANTIC_SIM_THRESHOLD:
+                return embedding, self._embedding_results[best]
+        return embedding, None
+
+    def classify(self, text: str) -> ClassificationResult:
+        """
+        Classify a single text.
+
+        Identical texts are served from an in-process cache; with
+        semantic_cache enabled, near-identical texts are matched by
+        embedding similarity before falling through to the API.
+
+        Args:
+            text: Text to classify
+
+        Returns:
+            ClassificationResult object
+        """
+        if not text or not text.strip():
+            return ClassificationResult(
+                text=text,
+                predicted_label="Other",
+                error="Empty text provided"
+            )
+
+        if self._input_too_long(text):
+            return self._length_error(text)
+
+        key = self._cache_key(text)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return ClassificationResult(
+                text=text,
+                predicted_label=cached["predicted_label"],
+                confidence=cached.get("confidence"),
+                rationale=cached.get("rationale")
+            )
+
+        embedding = None
+        if self.semantic_cache:
+            try:
+                embedding, near = self._semantic_lookup(text)
+                if near is not None:
+                    return ClassificationResult(
+                        text=text,
+                        predicted_label=near["predicted_label"],
+                        confidence=near.get("confidence"),
+                        rationale=near.get("rationale")
+                    )
+            except Exception:
+                # A failed embedding lookup should never block
+                # classification - fall through to the completion call
+                embedding = None
+
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(text),
+                temperature=0.0,  # Deterministic output
+                max_tokens=self.max_tokens,
+                response_format={"type": "json_object"}  # Force JSON response
+            )
+            
+            response_text = response.choices[0].message.content
+            parsed = self._parse_response(response_text)
+
+            self._cache_store(key, parsed)
+            if embedding is not None:
+                self._embeddings.append(embedding)
+                self._embedding_results.append(parsed)
+
+            return ClassificationResult(
+                text=text,
+                predicted_label=parsed["predicted_label"],
+                confidence=parsed.get("confidence"),
+                rationale=parsed.get("rationale")
+            )
+
+        except Exception as e:
+            return ClassificationResult(
+                text=text,
+                predicted_label="Other",
+                error=str(e)
+            )
+    
+    async def _classify_async(
+        self,
+        text: str,
+        semaphore: asyncio.Semaphore
+    ) -> ClassificationResult:
+        """Classify a single text against the async client, retrying
+        rate-limited or failed calls with exponential backoff"""
+        if not text or not text.strip():
+            return ClassificationResult(
+                text=text,
+                predicted_label="Other",
+                error="Empty text provided"
+            )
+
+        key = self._cache_key(text)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return ClassificationResult(
+                text=text,
+                predicted_label=cached["predicted_label"],
+                confidence=cached.get("confidence"),
+                rationale=cached.get("rationale")
+            )
+
+        async with semaphore:
+            last_error = None
+            for attempt in range(MAX_RETRIES):
+                try:
+                    await self._rate_limiter.acquire(self._estimate_tokens(text))
+                    response = await self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=self._build_messages(text),
+                        temperature=0.0,
+                        max_tokens=self.max_tokens,
+                        response_format={"type": "json_object"}
+                    )
+
+                    parsed = self._parse_response(response.choices[0].message.content)
+                    self._cache_store(key, parsed)
+                    return ClassificationResult(
+                        text=text,
+                        predicted_label=parsed["predicted_label"],
+                        confidence=parsed.get("confidence"),
+                        rationale=parsed.get("rationale")
+                    )
+                except (RateLimitError, APIError) as e:
+                    last_error = e
+                    await asyncio.sleep(RETRY_BASE_DELAY * (2 ** attempt))
+                except Exception as e:
+                    return ClassificationResult(
+                        text=text,
+                        predicted_label="Other",
+                        error=str(e)
+                    )
+
+            return ClassificationResult(
+                text=text,
+                predicted_label="Other",
+                error=str(last_error)
+            )
+
+    async def _classify_chunk_async(
+        self,
+        chunk: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> List[ClassificationResult]:
+        """Classify a chunk of texts with a single completion call.
+
+        Texts the model skips, mislabels or that fail to parse fall back
+        to individual classification calls.
+        """
+        entries = None
+        async with semaphore:
+            try:
+                await self._rate_limiter.acquire(
+                    sum(self._estimate_tokens(text) for text in chunk)
+                )
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_microbatch_messages(chunk),
+                    temperature=0.0,
+                    max_tokens=max(64, 16 * len(chunk)),
+                    response_format={"type": "json_object"}
+                )
+                entries = _json_loads(response.choices[0].message.content).get("results")
+            except Exception:
+                entries = None
+
+        results: List[Optional[ClassificationResult]] = [None] * len(chunk)
+        if entries:
+            for entry in entries:
+                try:
+                    index = int(entry["index"])
+                    label = self._match_label(str(entry["label"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if label is not None and 0 <= index < len(chunk) and results[index] is None:
+                    results[index] = ClassificationResult(
+                        text=chunk[index],
+                        predicted_label=label
+                    )
+                    self._cache_store(
+                        self._cache_key(chunk[index]),
+                        {"predicted_label": label, "confidence": None, "rationale": None}
+                    )
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fallback = await asyncio.gather(
+                *[self._classify_async(chunk[i], semaphore) for i in missing]
+            )
+            for i, result in zip(missing, fallback):
+                results[i] = result
+        return results
+
+    async def _classify_some_async(
+        self,
+        texts: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> List[ClassificationResult]:
+        """Classify one group of texts: empty texts and cache hits resolve
+        locally, the rest go out as one packed call (or individually in
+        verbose mode, since the packed prompt only returns labels)"""
+        results: List[Optional[ClassificationResult]] = [None] * len(texts)
+        too_long = self._input_too_long_many(texts)
+
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = ClassificationResult(
+                    text=text,
+                    predicted_label="Other",
+                    error="Empty text provided"
+                )
+                continue
+            if too_long[i]:
+                results[i] = self._length_error(text)
+                continue
+            cached = self._cache_lookup(self._cache_key(text))
+            if cached is not None:
+                results[i] = ClassificationResult(
+                    text=text,
+                    predicted_label=cached["predicted_label"],
+                    confidence=cached.get("confidence"),
+                    rationale=cached.get("rationale")
+                )
+            else:
+                pending.append(i)
+
+        if pending:
+            if self.verbose:
+                pending_results = await asyncio.gather(
+                    *[self._classify_async(texts[i], semaphore) for i in pending]
+                )
+            else:
+                pending_results = await self._classify_chunk_async(
+                    [texts[i] for i in pending], semaphore
+                )
+            for i, result in zip(pending, pending_results):
+                results[i] = result
+
+        return results
+
+    async def _classify_batch_async(
+        self,
+        texts: List[str],
+        batch_size: int = MICROBATCH_SIZE
+    ) -> List[ClassificationResult]:
+        """Fan the texts out in micro-batched groups with bounded
+        concurrency"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        groups = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        group_results = await asyncio.gather(
+            *[self._classify_some_async(group, semaphore) for group in groups]
+        )
+        return [result for group in group_results for result in group]
+
+    async def _classify_stream_async(
+        self,
+        texts,
+        batch_size: int = MICROBATCH_SIZE,
+        on_result=None
+    ):
+        """Classify an arbitrary iterable without materializing it first.
+
+        A bounded queue of micro-batch groups feeds a pool of consumers,
+        so classification starts before the input is exhausted and only
+        O(concurrency) input is held in flight at a time. When on_result
+        is given each result is handed to it as its group completes (not
+        necessarily in input order) instead of being accumulated.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency)
+        results: Dict[int, ClassificationResult] = {}
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                start, group = item
+                for offset, result in enumerate(await self._classify_some_async(group, semaphore)):
+                    if on_result is not None:
+                        on_result(start + offset, result)
+                    else:
+                        results[start + offset] = result
+
+        consumers = [asyncio.ensure_future(consume()) for _ in range(self.max_concurrency)]
+
+        start = 0
+        group = []
+        for text in texts:
+            group.append(text)
+            if len(group) == batch_size:
+                await queue.put((start, group))
+                start += len(group)
+                group = []
+        if group:
+            await queue.put((start, group))
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+
+        return [results[i] for i in range(len(results))]
+
+    def classify_batch(self, texts: List[str]) -> List[ClassificationResult]:
+        """
+        Classify multiple texts in batch.
+
+        Cache misses are packed MICROBATCH_SIZE texts per completion call
+        (amortizing HTTP and time-to-first-token overhead) and the chunks
+        are dispatched concurrently, bounded by max_concurrency. In
+        verbose mode texts are classified individually instead, since the
+        packed prompt only returns labels.
+
+        Args:
+            texts: List of texts to classify
+
+        Returns:
+            List of ClassificationResult objects, in input order
+        """
+        return asyncio.run(self._classify_batch_async(texts))
+
+    def classify_microbatch(
+        self,
+        texts: List[str],
+        batch_size: int = MICROBATCH_SIZE
+    ) -> List[ClassificationResult]:
+        """
+        Classify texts packing batch_size texts into each completion call.
+
+        Args:
+            texts: List of texts to classify
+            batch_size: Number of texts per completion request
+
+        Returns:
+            List of ClassificationResult objects, in input order
+        """
+        return asyncio.run(self._classify_batch_async(texts, batch_size=batch_size))
+
+    def classify_stream(self, texts, on_result=None) -> List[ClassificationResult]:
+        """
+        Classify an iterable of texts, starting work before the input is
+        fully consumed.
+
+        Unlike classify_batch this accepts any iterable (e.g. a lazy file
+        reader) and pulls from it on demand, so large inputs never have to
+        be materialized in memory.
+
+        Args:
+            texts: Iterable of texts to classify
+            on_result: Optional callback invoked as (index, result) the
+                moment each result completes; when given, results are not
+                accumulated and the return value is empty
+
+        Returns:
+            List of ClassificationResult objects in input order, or an
+            empty list when on_result is given
+        """
+        return asyncio.run(self._classify_stream_async(iter(texts), on_result=on_result))
+
+    def classify_batch_api(
+        self,
+        texts: List[str],
+        poll_interval: float = 30.0
+    ) -> List[ClassificationResult]:
+        """
+        Classify texts through the OpenAI Batch API.
+
+        About half the cost of synchronous requests and exempt from
+        per-minute rate limits, at the price of up to 24h turnaround -
+        intended for offline runs (--file together with --output).
+
+        Args:
+            texts: List of texts to classify
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            List of ClassificationResult objects, in input order
+        """
+        lines = []
+        for i, text in enumerate(texts):
+            lines.append(_json_dumps({
+                "custom_id": f"req-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": self._build_messages(text),
+                    "temperature": 0.0,
+                    "max_tokens": self.max_tokens,
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        payload = "\n".join(lines).encode("utf-8")
+
+        try:
+            batch_input = self.client.files.create(
+                file=("classification_batch.jsonl", payload),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_input.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+        except Exception as e:
+            return [
+                ClassificationResult(text=text, predicted_label="Other", error=str(e))
+                for text in texts
+            ]
+
+        if batch.status != "completed":
+            return [
+                ClassificationResult(
+                    text=text,
+                    predicted_label="Other",
+                    error=f"Batch ended with status '{batch.status}'"
+                )
+                for text in texts
+            ]
+
+        # Reassemble by custom_id - the Batch API does not guarantee that
+        # output lines come back in submission order
+        results = [
+            ClassificationResult(
+                text=text,
+                predicted_label="Other",
+                error="Missing from batch output"
+            )
+            for text in texts
+        ]
+        output = self.client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            entry = _json_loads(line)
+            index = int(entry["custom_id"].split("-", 1)[1])
+            try:
+                content = entry["response"]["body"]["choices"][0]["message"]["content"]
+                parsed = self._parse_response(content)
+                results[index] = ClassificationResult(
+                    text=texts[index],
+                    predicted_label=parsed["predicted_label"],
+                    confidence=parsed.get("confidence"),
+                    rationale=parsed.get("rationale")
+                )
+            except Exception as e:
+                results[index] = ClassificationResult(
+                    text=texts[index],
+                    predicted_label="Other",
+                    error=str(e)
+                )
+        return results
+
+
+def main():
+    """Command-line interface"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Text Classification Tool using OpenAI API"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        help="Text to classify (or use --file for batch processing)"
+    )
+    parser.add_argument(
+        "--file",
+        type=str,
+        help="Path to file containing texts (one per line or JSON array)"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        help="Path to configuration JSON file"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="gpt-3.5-turbo",
+        help="OpenAI model to use (default: gpt-3.5-turbo)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Output file path (default: stdout)"
+    )
+    parser.add_argument(
+        "--labels",
+        nargs="+",
+        help="Custom labels (overrides config file)"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Request confidence and rationale with each label "
+             "(slower - more output tokens to decode)"
+    )
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit file batches through the OpenAI Batch API "
+             "(~50%% cheaper, up to 24h turnaround)"
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="With --file: write each result as one JSON line the moment "
+             "it completes, instead of one array at the end (lines may be "
+             "out of input order; each carries its text)"
+    )
+    
+    args = parser.parse_args()
+    
+    # Initialize classifier
+    try:
+        classifier = TextClassifier(
+            model=args.model,
+            labels=args.labels,
+            config_file=args.config,
+            verbose=args.verbose
+        )
+    except Exception as e:
+        print(f"Error initializing classifier: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Process input
+    results = []
+    
+    if args.file:
+        # Batch processing from file
+        try:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                # Sniff the first non-whitespace character to decide the
+                # format without reading the whole file
+                first = f.read(1)
+                while first and first.isspace():
+                    first = f.read(1)
+
+                if first in ('[', '{'):
+                    # JSON input has to be parsed whole
+                    content = (first + f.read()).strip()
+                    try:
+                        texts = _json_loads(content)
+                        if isinstance(texts, list):
+                            texts = [str(t) for t in texts]
+                        else:
+                            texts = [content]
+                    except ValueError:
+                        texts = [line.strip() for line in content.split('\n') if line.strip()]
+                    source = texts
+                else:
+                    # Plain text: one entry per line, read lazily
+                    def iter_lines():
+                        line = (first + f.readline()).strip()
+                        if line:
+                            yield line
+                        for raw in f:
+                            raw = raw.strip()
+                            if raw:
+                                yield raw
+
+                    source = iter_lines()
+
+                if args.batch_api:
+                    # The Batch API uploads one file, so the full list is
+                    # needed up front anyway
+                    if not isinstance(source, list):
+                        source = list(source)
+                    results = classifier.classify_batch_api(source)
+                elif args.ndjson:
+                    # Stream one JSON line per result as it completes, so
+                    # nothing accumulates and output starts immediately
+                    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+                    try:
+                        def write_result(index, result):
+                            out.write(_json_dumps(_result_record(result)) + "\n")
+                            out.flush()
+
+                        classifier.classify_stream(source, on_result=write_result)
+                    finally:
+                        if args.output:
+                            out.close()
+                    if args.output:
+                        print(f"Results written to {args.output}")
+                    sys.exit(0)
+                elif isinstance(source, list):
+                    results = classifier.classify_batch(source)
+                else:
+                    results = classifier.classify_stream(source)
+        except FileNotFoundError:
+            print(f"Error: File not found: {args.file}", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error reading file: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    elif args.input:
+        # Single text classification
+        result = classifier.classify(args.input)
+        results = [result]
+    
+    else:
+        # Interactive mode
+        print("Text Classifier - Interactive Mode")
+        print("Enter text to classify (or 'quit' to exit):")
+        print(f"Available labels: {', '.join(classifier.labels)}\n")
+        
+        while True:
+            try:
+                text = input("> ").strip()
+                if text.lower() in ['quit', 'exit', 'q']:
+                    break
+                if not text:
+                    continue
+                
+                result = classifier.classify(text)
+                output = {
+                    "text": result.text,
+                    "predicted_label": result.predicted_label,
+                    "confidence": result.confidence,
+                    "rationale": result.rationale
+                }
+                if result.error:
+                    output["error"] = result.error
+                
+                print(_json_dumps_indent(output))
+                print()
+            except KeyboardInterrupt:
+                print("\nExiting...")
+                break
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+        
+        sys.exit(0)
+    
+    # Format output: serialize the dataclasses directly, dropping unset
+    # optional fields
+    output_data = [_result_record(result) for result in results]
+
+    # Output results
+    output_json = _json_dumps_indent(output_data)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output_json)
+        print(f"Results written to {args.output}")
+    else:
+        print(output_json)
+
+
+if __name__ == "__main__":
+    main()
+